@@ -19,17 +19,40 @@ final class PaddleOCRRunner: @unchecked Sendable {
         self.pythonPath = ProcessInfo.processInfo.environment["PADDLEOCR_VL_PYTHON"] ?? "/usr/bin/python3"
     }
 
+    static var usesDaemon: Bool {
+        ProcessInfo.processInfo.environment["PADDLEOCR_VL_DAEMON"] != "0"
+    }
+
+    func prewarm() {
+        guard Self.usesDaemon else { return }
+        PaddleOCRDaemon.shared.prewarm(scriptURL: scriptURL, pythonPath: pythonPath)
+    }
+
     func recognizeText(in image: CGImage, completion: @escaping @Sendable (Result<[RecognizedTextBox], Error>) -> Void) {
         let scriptURL = scriptURL
         let pythonPath = pythonPath
         DispatchQueue.global(qos: .userInitiated).async {
             autoreleasepool {
+                let imageData: Data
                 do {
-                    let imageData = try Self.encodePNG(image)
-                    let result = try Self.runOCR(imageData: imageData, scriptURL: scriptURL, pythonPath: pythonPath)
-                    completion(.success(result))
+                    imageData = try Self.encodePNG(image)
                 } catch {
                     completion(.failure(error))
+                    return
+                }
+
+                guard Self.usesDaemon else {
+                    do {
+                        let outputData = try Self.runOneShot(imageData: imageData, scriptURL: scriptURL, pythonPath: pythonPath)
+                        completion(Result(catching: { try Self.parseResponse(outputData) }))
+                    } catch {
+                        completion(.failure(error))
+                    }
+                    return
+                }
+
+                PaddleOCRDaemon.shared.recognize(imageData: imageData, scriptURL: scriptURL, pythonPath: pythonPath) { result in
+                    completion(result.flatMap { outputData in Result(catching: { try Self.parseResponse(outputData) }) })
                 }
             }
         }
@@ -43,7 +66,7 @@ final class PaddleOCRRunner: @unchecked Sendable {
         return data
     }
 
-    private static func runOCR(imageData: Data, scriptURL: URL, pythonPath: String) throws -> [RecognizedTextBox] {
+    private static func runOneShot(imageData: Data, scriptURL: URL, pythonPath: String) throws -> Data {
         let process = Process()
         process.executableURL = URL(fileURLWithPath: pythonPath)
         process.arguments = [scriptURL.path, "--stdin"]
@@ -76,11 +99,18 @@ final class PaddleOCRRunner: @unchecked Sendable {
             let errorMessage = String(data: errorData, encoding: .utf8) ?? "Unknown error"
             throw PaddleOCRRunnerError.processFailed(errorMessage)
         }
+        return outputData
+    }
 
+    private static func parseResponse(_ outputData: Data) throws -> [RecognizedTextBox] {
         guard !outputData.isEmpty else {
             throw PaddleOCRRunnerError.invalidResponse
         }
 
+        if let failure = try? JSONDecoder().decode(PaddleOCRErrorResponse.self, from: outputData) {
+            throw PaddleOCRRunnerError.processFailed(failure.error)
+        }
+
         let response = try JSONDecoder().decode(PaddleOCRResponse.self, from: outputData)
         let boxes = response.boxes.compactMap { box -> RecognizedTextBox? in
             guard box.rect.count == 4 else { return nil }
@@ -101,6 +131,172 @@ final class PaddleOCRRunner: @unchecked Sendable {
     }
 }
 
+private final class PaddleOCRDaemon: @unchecked Sendable {
+    static let shared = PaddleOCRDaemon()
+
+    private typealias Completion = @Sendable (Result<Data, Error>) -> Void
+
+    private let queue = DispatchQueue(label: "ocr-screenshot.paddle.daemon", qos: .userInitiated)
+    private var process: Process?
+    private var inputHandle: FileHandle?
+    private var buffer = Data()
+    private var pending: [(Data, Completion)] = []
+    private var inFlight: Completion?
+    private var isReady = false
+
+    func prewarm(scriptURL: URL, pythonPath: String) {
+        queue.async {
+            self.startIfNeeded(scriptURL: scriptURL, pythonPath: pythonPath)
+        }
+    }
+
+    func recognize(imageData: Data, scriptURL: URL, pythonPath: String, completion: @escaping @Sendable (Result<Data, Error>) -> Void) {
+        queue.async {
+            self.pending.append((imageData, completion))
+            self.startIfNeeded(scriptURL: scriptURL, pythonPath: pythonPath)
+            self.sendNextIfIdle()
+        }
+    }
+
+    private func startIfNeeded(scriptURL: URL, pythonPath: String) {
+        guard process == nil else { return }
+        isReady = false
+
+        let process = Process()
+        process.executableURL = URL(fileURLWithPath: pythonPath)
+        process.arguments = [scriptURL.path, "--daemon"]
+
+        var environment = ProcessInfo.processInfo.environment
+        environment["PYTHONUNBUFFERED"] = "1"
+        process.environment = environment
+
+        let inputPipe = Pipe()
+        let outputPipe = Pipe()
+        let errorPipe = Pipe()
+        process.standardInput = inputPipe
+        process.standardOutput = outputPipe
+        process.standardError = errorPipe
+
+        let strongSelf = self
+        outputPipe.fileHandleForReading.readabilityHandler = { handle in
+            let data = handle.availableData
+            if data.isEmpty {
+                handle.readabilityHandler = nil
+                return
+            }
+            strongSelf.queue.async {
+                strongSelf.buffer.append(data)
+                strongSelf.consumeOutputLines()
+            }
+        }
+
+        errorPipe.fileHandleForReading.readabilityHandler = { handle in
+            let data = handle.availableData
+            if data.isEmpty {
+                handle.readabilityHandler = nil
+                return
+            }
+            if let message = String(data: data, encoding: .utf8) {
+                for line in message.split(separator: "\n") {
+                    AppLog.info("[paddle] \(line)")
+                }
+            }
+        }
+
+        process.terminationHandler = { process in
+            let status = process.terminationStatus
+            strongSelf.queue.async {
+                strongSelf.handleProcessExit(status: status)
+            }
+        }
+
+        do {
+            try process.run()
+            self.process = process
+            self.inputHandle = inputPipe.fileHandleForWriting
+            AppLog.info("PaddleOCR daemon started.")
+        } catch {
+            AppLog.error("Failed to start PaddleOCR daemon: \(error)")
+            failAll(PaddleOCRRunnerError.processFailed("Failed to start PaddleOCR: \(error)"))
+        }
+    }
+
+    private func handleProcessExit(status: Int32) {
+        guard process != nil else { return }
+        AppLog.error("PaddleOCR daemon exited (status \(status)).")
+        process = nil
+        inputHandle = nil
+        buffer.removeAll()
+        isReady = false
+        failAll(PaddleOCRRunnerError.processFailed("PaddleOCR daemon exited with status \(status)"))
+    }
+
+    private func failAll(_ error: Error) {
+        let callbacks = (inFlight.map { [$0] } ?? []) + pending.map { $0.1 }
+        inFlight = nil
+        pending.removeAll()
+        for callback in callbacks {
+            callback(.failure(error))
+        }
+    }
+
+    private func sendNextIfIdle() {
+        guard inFlight == nil, isReady, let inputHandle, process != nil else { return }
+        guard !pending.isEmpty else { return }
+
+        let (imageData, completion) = pending.removeFirst()
+        inFlight = completion
+        let payload: [String: String] = ["image": imageData.base64EncodedString()]
+        do {
+            var line = try JSONSerialization.data(withJSONObject: payload)
+            line.append(0x0A)
+            try inputHandle.write(contentsOf: line)
+        } catch {
+            AppLog.error("PaddleOCR daemon write failed: \(error)")
+            inFlight = nil
+            completion(.failure(PaddleOCRRunnerError.processFailed("Failed to write OCR input: \(error)")))
+            sendNextIfIdle()
+        }
+    }
+
+    private func consumeOutputLines() {
+        while let range = buffer.firstRange(of: Data([0x0A])) {
+            let lineData = buffer.subdata(in: 0..<range.lowerBound)
+            buffer.removeSubrange(0...range.lowerBound)
+            handleOutputLine(lineData)
+        }
+    }
+
+    private func handleOutputLine(_ data: Data) {
+        guard !data.isEmpty else { return }
+
+        if !isReady {
+            if let message = try? JSONDecoder().decode(PaddleOCRReadyMessage.self, from: data), message.ready {
+                AppLog.info("PaddleOCR daemon ready.")
+                isReady = true
+                sendNextIfIdle()
+            }
+            return
+        }
+
+        guard let completion = inFlight else {
+            AppLog.info("PaddleOCR response skipped (no in-flight request).")
+            return
+        }
+        inFlight = nil
+        completion(.success(data))
+        sendNextIfIdle()
+    }
+}
+
+private struct PaddleOCRReadyMessage: Decodable {
+    let ready: Bool
+}
+
+private struct PaddleOCRErrorResponse: Decodable {
+    let error: String
+}
+
 private struct PaddleOCRResponse: Decodable {
     let width: Double
     let height: Double
@@ -1,10 +1,49 @@
 #!/usr/bin/env python3
+import importlib.util
 import json
 import os
 import re
+import shutil
 import sys
+import time
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
+
+_PREFIX_RE = re.compile(r"(?i)^(the\s+)?corrected\s+text\s+is\s+as\s+follows:?\s*$")
+_CORRECTED_TEXT_RE = re.compile(r"(?i)^corrected\s+text:?\s*$")
+_CORRECTED_RE = re.compile(r"(?i)^corrected:?\s*$")
+_LABEL_ONLY_RE = re.compile(r"(?i)^corrected(\s+text)?\s*:?\s*$")
+_OPTION_RE = re.compile(r"^\s*([A-H]|\d{1,2})[.)]\s+")
+_FENCE_START_RE = re.compile(r"^```[^\n]*\n")
+_FENCE_END_RE = re.compile(r"\n```$")
+_CONTENT_RANGE_RE = re.compile(r"^bytes (?:(\d+)-\d+|\*)/(\d+|\*)$")
+_MARKERS_RE = re.compile(r"<<<(?:TEXT|END|OUT|ENDOUT)>>>")
+_MISSING_SPACE_RE = re.compile(r"[a-z][A-Z]|[a-z][.,;:!?][A-Z]")
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_COMMON_WORDS = frozenset(
+    """
+    the and for are but not you all any can had her was one our out day get has him his how man new now
+    old see two way who boy did its let put say she too use yes off own few why ago end far set top
+    that with have this will your from they know want been good much some time very when come here just
+    like long make many more only over such take than them well were what also back call each even find
+    give into last most must name next none same then true used word work year both down does done high
+    left line part read show side test unit upon case code data file page note list item text
+    about after again below could every first found great other right small still their there these
+    thing think three where which while would write answer before choose correct figure follow number
+    option please select should table answers options question questions following statement false
+    """.split()
+)
 
 
 def log(message: str) -> None:
@@ -40,10 +79,12 @@ def _load_hf_token() -> str:
     return ""
 
 
-def _request(url: str, token: str):
+def _request(url: str, token: str, extra_headers=None):
     headers = {"User-Agent": "ocr-screenshot/1.0"}
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    if extra_headers:
+        headers.update(extra_headers)
     req = urllib.request.Request(url, headers=headers)
     return urllib.request.urlopen(req)
 
@@ -70,23 +111,35 @@ def _select_repo():
     return candidates[0], candidates
 
 
-def _list_repo_files(repo: str, token: str):
-    url = f"https://huggingface.co/api/models/{repo}"
-    try:
-        with _request(url, token) as response:
-            payload = json.loads(response.read().decode("utf-8"))
-            return [item.get("rfilename", "") for item in payload.get("siblings", [])]
-    except urllib.error.HTTPError as exc:
-        if exc.code == 401:
-            if token:
-                log(f"Repo lookup unauthorized for {repo}. Accept the model license on Hugging Face.")
-            else:
-                log(f"Repo lookup unauthorized for {repo}. Set HUGGINGFACE_TOKEN or login with huggingface-cli.")
+def _log_repo_lookup_error(repo: str, token: str, exc: Exception) -> None:
+    if isinstance(exc, urllib.error.HTTPError):
+        status = exc.code
+    else:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 401:
+        if token:
+            log(f"Repo lookup unauthorized for {repo}. Accept the model license on Hugging Face.")
         else:
-            log(f"Repo lookup failed for {repo}: {exc}")
-    except Exception as exc:
+            log(f"Repo lookup unauthorized for {repo}. Set HUGGINGFACE_TOKEN or login with huggingface-cli.")
+    elif status is not None:
+        log(f"Repo lookup failed for {repo}: {exc}")
+    else:
         log(f"Repo lookup error for {repo}: {exc}")
-    return []
+
+
+def _list_repo_files(repo: str, token: str):
+    try:
+        from huggingface_hub import HfApi
+    except Exception:
+        return _list_repo_files_http(repo, token)
+    return HfApi().list_repo_files(repo, token=token or None)
+
+
+def _list_repo_files_http(repo: str, token: str):
+    url = f"https://huggingface.co/api/models/{repo}"
+    with _request(url, token) as response:
+        payload = json.loads(response.read().decode("utf-8"))
+        return [item.get("rfilename", "") for item in payload.get("siblings", [])]
 
 
 def _choose_gguf(files, require_q4: bool):
@@ -108,23 +161,116 @@ def _choose_gguf(files, require_q4: bool):
     return ggufs[0]
 
 
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except Exception:
+        pass
+
+
+def _read_validator(path: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.read().strip()
+    except Exception:
+        return ""
+
+
+def _response_validator(headers) -> str:
+    etag = headers.get("ETag", "")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified", "")
+
+
+def _content_range(headers):
+    match = _CONTENT_RANGE_RE.match(headers.get("Content-Range", ""))
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return (int(start) if start else None), (int(total) if total != "*" else None)
+
+
 def _download_file(url: str, destination: str, token: str) -> None:
+    partial_path = destination + ".part"
+    validator_path = partial_path + ".validator"
+    validator = _read_validator(validator_path)
+    offset = os.path.getsize(partial_path) if validator and os.path.isfile(partial_path) else 0
+    extra_headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else None
     try:
-        with _request(url, token) as response, open(destination, "wb") as handle:
-            while True:
-                chunk = response.read(1024 * 1024)
-                if not chunk:
-                    break
-                handle.write(chunk)
+        with _request(url, token, extra_headers) as response:
+            resumed = offset > 0 and response.status == 206
+            if resumed:
+                start, _ = _content_range(response.headers)
+                if start != offset:
+                    _remove_quietly(partial_path)
+                    _remove_quietly(validator_path)
+                    raise RuntimeError(f"unexpected Content-Range {response.headers.get('Content-Range')!r}")
+                log(f"Resuming download at {offset} bytes...")
+            else:
+                if offset:
+                    log("Remote file changed or range unsupported; restarting download.")
+                validator = _response_validator(response.headers)
+                if validator:
+                    with open(validator_path, "w", encoding="utf-8") as handle:
+                        handle.write(validator)
+                else:
+                    _remove_quietly(validator_path)
+            with open(partial_path, "ab" if resumed else "wb", buffering=0) as handle:
+                shutil.copyfileobj(response, handle, length=8 * 1024 * 1024)
+    except urllib.error.HTTPError as exc:
+        _, total = _content_range(exc.headers or {})
+        if exc.code == 416 and offset and total == offset:
+            log("Partial download already complete.")
+        else:
+            if 400 <= exc.code < 500:
+                _remove_quietly(partial_path)
+                _remove_quietly(validator_path)
+            raise RuntimeError(f"Failed to download model: {exc}") from exc
+    except Exception as exc:
+        raise RuntimeError(f"Failed to download model: {exc}") from exc
+    try:
+        os.replace(partial_path, destination)
+    except Exception as exc:
+        raise RuntimeError(f"Failed to download model: {exc}") from exc
+    _remove_quietly(validator_path)
+
+
+def _download_repo_file(repo: str, filename: str, model_dir: str, token: str) -> str:
+    try:
+        from huggingface_hub import hf_hub_download
+    except Exception:
+        model_path = os.path.join(model_dir, filename)
+        url = f"https://huggingface.co/{repo}/resolve/main/{filename}"
+        _download_file(url, model_path, token)
+        return model_path
+    try:
+        return hf_hub_download(repo_id=repo, filename=filename, local_dir=model_dir, token=token or None)
     except Exception as exc:
-        if os.path.exists(destination):
-            try:
-                os.remove(destination)
-            except Exception:
-                pass
         raise RuntimeError(f"Failed to download model: {exc}") from exc
 
 
+def _load_selection(model_dir: str):
+    path = os.path.join(model_dir, "selection.json")
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            selection = json.load(handle)
+    except Exception:
+        return None
+    if not isinstance(selection, dict) or not selection.get("repo") or not selection.get("file"):
+        return None
+    return selection
+
+
+def _save_selection(model_dir: str, repo: str, filename: str) -> None:
+    path = os.path.join(model_dir, "selection.json")
+    try:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"repo": repo, "file": filename, "mtime": time.time()}, handle)
+    except Exception as exc:
+        log(f"Failed to save model selection: {exc}")
+
+
 def _ensure_model():
     model_path = os.environ.get("DANUBE_MODEL_PATH")
     if model_path and os.path.isfile(model_path):
@@ -150,6 +296,12 @@ def _ensure_model():
             return candidate
 
     repo_override = os.environ.get("DANUBE_MODEL_REPO")
+    selection = _load_selection(model_dir)
+    if selection and (not repo_override or selection["repo"] == repo_override):
+        cached_path = os.path.join(model_dir, selection["file"])
+        if os.path.isfile(cached_path):
+            return cached_path
+
     if repo_override:
         repos_to_try = [repo_override]
     else:
@@ -160,45 +312,57 @@ def _ensure_model():
     selected_repo = None
     selected_file = None
     require_q4 = os.environ.get("DANUBE_ALLOW_NON_Q4", "0") == "0"
-    for repo in repos_to_try:
-        files = _list_repo_files(repo, token)
-        chosen = _choose_gguf(files, require_q4=require_q4)
-        if chosen:
-            selected_repo = repo
-            selected_file = chosen
-            break
+    executor = ThreadPoolExecutor(max_workers=min(6, len(repos_to_try)))
+    try:
+        futures = [executor.submit(_list_repo_files, repo, token) for repo in repos_to_try]
+        for repo, future in zip(repos_to_try, futures):
+            try:
+                files = future.result()
+            except Exception as exc:
+                _log_repo_lookup_error(repo, token, exc)
+                continue
+            chosen = _choose_gguf(files, require_q4=require_q4)
+            if chosen:
+                selected_repo = repo
+                selected_file = chosen
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     if not selected_repo or not selected_file:
         raise RuntimeError("Could not locate a Q4 GGUF model for Qwen3-1.7B (or fallback Qwen2.5-1.5B).")
 
     log(f"Selected model {selected_repo}/{selected_file}")
     model_path = os.path.join(model_dir, selected_file)
-    if os.path.isfile(model_path):
-        return model_path
-    url = f"https://huggingface.co/{selected_repo}/resolve/main/{selected_file}"
-    log(f"Downloading model {selected_repo}/{selected_file}...")
-    _download_file(url, model_path, token)
+    if not os.path.isfile(model_path):
+        log(f"Downloading model {selected_repo}/{selected_file}...")
+        model_path = _download_repo_file(selected_repo, selected_file, model_dir, token)
+    _save_selection(model_dir, selected_repo, selected_file)
     return model_path
 
 
-def _make_prompt(text: str) -> str:
+_PROMPT_PREFIX = (
+    "You are a text post-processor.\n"
+    "Rules:\n"
+    "- Only adjust whitespace, line breaks, and indentation.\n"
+    "- Fix missing spaces between words (example: \"andthe\" -> \"and the\").\n"
+    "- Do not change words, punctuation, or numbers.\n"
+    "- Do not add or remove content.\n"
+    "- Preserve table pipes and dashes (\"|\" and \"-\") if present.\n"
+    "- If table rows are present, keep the number of rows and column separators unchanged.\n"
+    "- Add a blank line before and after any Markdown table block.\n"
+    "- Add a blank line before multiple-choice answer blocks (A., B., C., etc.).\n"
+    "- Do not add labels like \"Corrected Text:\".\n"
+    "- Do not repeat the input or any markers.\n"
+    "Return only the corrected text.\n"
+    "End your response with <<<ENDOUT>>> on its own line.\n\n"
+    "Text:\n"
+    "<<<TEXT>>>\n"
+)
+
+
+def _format_text(text: str) -> str:
     return (
-        "You are a text post-processor.\n"
-        "Rules:\n"
-        "- Only adjust whitespace, line breaks, and indentation.\n"
-        "- Fix missing spaces between words (example: \"andthe\" -> \"and the\").\n"
-        "- Do not change words, punctuation, or numbers.\n"
-        "- Do not add or remove content.\n"
-        "- Preserve table pipes and dashes (\"|\" and \"-\") if present.\n"
-        "- If table rows are present, keep the number of rows and column separators unchanged.\n"
-        "- Add a blank line before and after any Markdown table block.\n"
-        "- Add a blank line before multiple-choice answer blocks (A., B., C., etc.).\n"
-        "- Do not add labels like \"Corrected Text:\".\n"
-        "- Do not repeat the input or any markers.\n"
-        "Return only the corrected text.\n"
-        "End your response with <<<ENDOUT>>> on its own line.\n\n"
-        "Text:\n"
-        "<<<TEXT>>>\n"
         f"{text}\n"
         "<<<END>>>\n\n"
         "Corrected:\n"
@@ -206,54 +370,99 @@ def _make_prompt(text: str) -> str:
     )
 
 
+def _make_prompt(text: str) -> str:
+    return _PROMPT_PREFIX + _format_text(text)
+
+
 def _max_tokens(text: str, n_ctx: int) -> int:
     estimate = max(128, len(text) // 2)
     return max(128, min(2048, min(estimate, max(128, n_ctx - 128))))
 
 
+def _default_gpu_layers() -> str:
+    if sys.platform != "darwin":
+        return "0"
+    try:
+        import llama_cpp
+        if llama_cpp.llama_supports_gpu_offload():
+            return "-1"
+    except Exception:
+        pass
+    return "0"
+
+
 def _load_llm(model_path: str):
     from llama_cpp import Llama
 
     n_ctx = int(_env("DANUBE_N_CTX", "2048"))
+    n_batch = int(_env("DANUBE_N_BATCH", "2048"))
+    n_ubatch = int(_env("DANUBE_N_UBATCH", "512"))
     n_threads = int(_env("DANUBE_N_THREADS", str(max(1, (os.cpu_count() or 4) - 1))))
-    n_gpu_layers = int(_env("DANUBE_GPU_LAYERS", "0"))
-    log(f"Loading model {os.path.basename(model_path)} (ctx={n_ctx}, threads={n_threads}, gpu_layers={n_gpu_layers})...")
+    n_threads_batch = int(_env("DANUBE_N_THREADS_BATCH", str(os.cpu_count() or 4)))
+    n_gpu_layers = int(_env("DANUBE_GPU_LAYERS", _default_gpu_layers()))
+    log(
+        f"Loading model {os.path.basename(model_path)} (ctx={n_ctx}, batch={n_batch}, ubatch={n_ubatch}, "
+        f"threads={n_threads}, threads_batch={n_threads_batch}, gpu_layers={n_gpu_layers})..."
+    )
     llm = Llama(
         model_path=model_path,
         n_ctx=n_ctx,
+        n_batch=n_batch,
+        n_ubatch=n_ubatch,
         n_threads=n_threads,
+        n_threads_batch=n_threads_batch,
         n_gpu_layers=n_gpu_layers,
         seed=0,
         verbose=False,
     )
+    _warm_prompt_prefix(llm)
     return llm, n_ctx
 
 
-def _process_one(llm, n_ctx: int, text: str) -> str:
+def _warm_prompt_prefix(llm) -> None:
+    try:
+        llm.eval(llm.tokenize(_PROMPT_PREFIX.encode("utf-8")))
+    except Exception as exc:
+        log(f"Prompt prefix warmup failed: {exc}")
+
+
+def _needs_llm(text: str) -> bool:
+    if _MISSING_SPACE_RE.search(text):
+        return True
+    for word in _WORD_RE.findall(text):
+        if len(word) > 2 and word.lower() not in _COMMON_WORDS:
+            return True
+    return False
+
+
+def _process_one(llm, n_ctx: int, text: str, fast_path_chars: int) -> str:
+    if len(text) < fast_path_chars and not _needs_llm(text):
+        return _format_output(text.strip())
+
     prompt = _make_prompt(text)
     max_tokens = _max_tokens(text, n_ctx)
     result = llm(
         prompt,
         max_tokens=max_tokens,
         temperature=0.0,
-        top_p=0.9,
-        repeat_penalty=1.05,
+        top_k=1,
+        top_p=1.0,
+        repeat_penalty=1.0,
         stop=["<<<ENDOUT>>>"],
     )
     output = result["choices"][0]["text"]
     cleaned = _clean_output(output)
     if not cleaned:
         return ""
-    cleaned = _add_table_spacing(cleaned)
-    return _add_option_spacing(cleaned)
+    return _format_output(cleaned)
 
 
 def _strip_code_fences(text: str) -> str:
     cleaned = text
     if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```[^\n]*\n", "", cleaned)
+        cleaned = _FENCE_START_RE.sub("", cleaned)
     if cleaned.endswith("```"):
-        cleaned = re.sub(r"\n```$", "", cleaned)
+        cleaned = _FENCE_END_RE.sub("", cleaned)
     return cleaned
 
 
@@ -261,13 +470,13 @@ def _strip_prefix_lines(text: str) -> str:
     lines = text.splitlines()
     while lines:
         line = lines[0].strip()
-        if re.match(r"(?i)^(the\s+)?corrected\s+text\s+is\s+as\s+follows:?\s*$", line):
+        if _PREFIX_RE.match(line):
             lines.pop(0)
             continue
-        if re.match(r"(?i)^corrected\s+text:?\s*$", line):
+        if _CORRECTED_TEXT_RE.match(line):
             lines.pop(0)
             continue
-        if re.match(r"(?i)^corrected:?\s*$", line):
+        if _CORRECTED_RE.match(line):
             lines.pop(0)
             continue
         break
@@ -292,18 +501,16 @@ def _clean_output(output: str) -> str:
     cleaned = _strip_code_fences(cleaned).strip()
     cleaned = _strip_prefix_lines(cleaned)
 
-    if "<<<TEXT>>>" in cleaned and "<<<END>>>" in cleaned:
-        extracted = _extract_between(cleaned, "<<<TEXT>>>", "<<<END>>>")
-        if extracted:
-            cleaned = extracted
+    extracted = _extract_between(cleaned, "<<<TEXT>>>", "<<<END>>>")
+    if extracted:
+        cleaned = extracted
 
-    if "<<<OUT>>>" in cleaned:
-        tail = cleaned.rsplit("<<<OUT>>>", 1)[1].strip()
-        if tail:
-            cleaned = tail
+    _, marker, tail = cleaned.rpartition("<<<OUT>>>")
+    tail = tail.strip()
+    if marker and tail:
+        cleaned = tail
 
-    for marker in ("<<<TEXT>>>", "<<<END>>>", "<<<OUT>>>", "<<<ENDOUT>>>"):
-        cleaned = cleaned.replace(marker, "")
+    cleaned = _MARKERS_RE.sub("", cleaned)
 
     cleaned = _strip_prefix_lines(cleaned)
     cleaned = _strip_code_fences(cleaned).strip()
@@ -312,94 +519,120 @@ def _clean_output(output: str) -> str:
     return cleaned
 
 
-def _add_table_spacing(text: str) -> str:
+def _format_output(text: str) -> str:
     lines = text.splitlines()
     if not lines:
         return text
 
-    def is_table_line(line: str) -> bool:
-        stripped = line.lstrip()
-        return stripped.startswith("|") and stripped.count("|") >= 2
+    last = len(lines) - 1
+    while last >= 0 and not _is_nonblank(lines[last]):
+        last -= 1
+    if last < 0:
+        return ""
+    del lines[last + 1:]
+    lines[last] = lines[last].rstrip()
 
     result = []
+    prev_nonblank = False
+    in_option_block = False
     i = 0
     while i < len(lines):
-        if is_table_line(lines[i]):
+        line = lines[i]
+        if _is_table_line(line):
             start = i
-            while i < len(lines) and is_table_line(lines[i]):
+            while i < len(lines) and _is_table_line(lines[i]):
                 i += 1
-            if result and result[-1].strip():
+            if prev_nonblank:
                 result.append("")
             result.extend(lines[start:i])
-            if i < len(lines) and lines[i].strip():
+            prev_nonblank = True
+            in_option_block = False
+            if i < len(lines) and _is_nonblank(lines[i]):
                 result.append("")
-        else:
-            result.append(lines[i])
-            i += 1
+                prev_nonblank = False
+            continue
+
+        nonblank = _is_nonblank(line)
+        if _is_option_line(line):
+            if not in_option_block and prev_nonblank:
+                result.append("")
+            in_option_block = True
+        elif nonblank:
+            in_option_block = False
+        result.append(line)
+        prev_nonblank = nonblank
+        i += 1
+
     return "\n".join(result).rstrip()
 
 
-def _add_option_spacing(text: str) -> str:
-    lines = text.splitlines()
-    if not lines:
-        return text
+def _is_table_line(line: str) -> bool:
+    stripped = line.lstrip()
+    return stripped.startswith("|") and stripped.count("|") >= 2
 
-    option_pattern = re.compile(r"^\s*([A-H]|\d{1,2})[.)]\s+")
-    result = []
-    in_option_block = False
 
-    for line in lines:
-        stripped = line.strip()
-        is_option = bool(option_pattern.match(line))
-        if is_option:
-            if not in_option_block and result and result[-1].strip():
-                result.append("")
-            in_option_block = True
-            result.append(line)
-            continue
+def _is_option_line(line: str) -> bool:
+    first = line.lstrip()[:1]
+    if not first or not (first in "ABCDEFGH" or first.isdigit()):
+        return False
+    return bool(_OPTION_RE.match(line))
 
-        result.append(line)
-        if stripped:
-            in_option_block = False
 
-    return "\n".join(result).rstrip()
+def _is_nonblank(line: str) -> bool:
+    return bool(line) and not line.isspace()
 
 
 def _is_label_only(text: str) -> bool:
     stripped = text.strip()
     if not stripped:
         return True
-    return bool(re.match(r"(?i)^corrected(\s+text)?\s*:?\s*$", stripped))
+    return bool(_LABEL_ONLY_RE.match(stripped))
+
+
+def _loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_response(payload: dict) -> None:
+    if orjson is not None:
+        data = orjson.dumps(payload)
+    else:
+        data = json.dumps(payload).encode("utf-8")
+    sys.stdout.buffer.write(data + b"\n")
+    sys.stdout.buffer.flush()
 
 
 def main() -> int:
     try:
+        fast_path_chars = int(_env("DANUBE_FAST_PATH_CHARS", "64"))
         model_path = _ensure_model()
         llm, n_ctx = _load_llm(model_path)
     except Exception as exc:
         log(str(exc))
         return 2
-    sys.stdout.write(json.dumps({"ready": True}) + "\n")
-    sys.stdout.flush()
+    _write_response({"ready": True})
 
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
+    stdin = sys.stdin.buffer
+    while True:
+        raw = stdin.readline()
+        if not raw:
+            break
+        raw = raw.strip()
+        if not raw:
             continue
         try:
-            payload = json.loads(line)
+            payload = _loads(raw)
             text = payload.get("text", "")
             if not text:
-                sys.stdout.write(json.dumps({"text": ""}) + "\n")
-                sys.stdout.flush()
+                _write_response({"text": ""})
                 continue
-            output = _process_one(llm, n_ctx, text)
-            sys.stdout.write(json.dumps({"text": output}) + "\n")
-            sys.stdout.flush()
+            output = _process_one(llm, n_ctx, text, fast_path_chars)
+            _write_response({"text": output})
         except Exception as exc:
             log(f"Processing error: {exc}")
-            sys.stdout.write(json.dumps({"text": ""}) + "\n")
-            sys.stdout.flush()
+            _write_response({"text": ""})
 
     return 0
 
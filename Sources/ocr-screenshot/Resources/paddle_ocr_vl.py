@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 import argparse
+import base64
 import json
 import os
+import struct
 import sys
 
+try:
+    import numpy as np
+except Exception:
+    np = None
+
 
 def _error(message: str, code: int) -> None:
     print(message, file=sys.stderr)
@@ -17,16 +24,42 @@ def _image_size(path: str):
             return image.size
     except Exception:
         try:
-            import cv2
-            image = cv2.imread(path)
-            if image is None:
-                return None
-            height, width = image.shape[:2]
-            return width, height
+            return _header_image_size(path)
         except Exception:
             return None
 
 
+def _header_image_size(path: str):
+    with open(path, "rb") as handle:
+        header = handle.read(24)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if not header.startswith(b"\xff\xd8"):
+            return None
+        handle.seek(2)
+        while True:
+            marker = handle.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            if code == 0xFF:
+                handle.seek(-1, os.SEEK_CUR)
+                continue
+            if code in (0x01, 0xD8) or 0xD0 <= code <= 0xD7:
+                continue
+            length_bytes = handle.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0]
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                frame = handle.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack(">HH", frame[1:5])
+                return width, height
+            handle.seek(length - 2, os.SEEK_CUR)
+
+
 def _is_line_entry(entry):
     if not isinstance(entry, (list, tuple)) or len(entry) < 2:
         return False
@@ -63,11 +96,128 @@ def _has_model_files(path: str) -> bool:
     return any(os.path.exists(os.path.join(path, marker)) for marker in markers)
 
 
+def _box_bounds(boxes):
+    if np is not None and boxes:
+        try:
+            points = np.asarray(boxes, dtype=np.float64)
+        except Exception:
+            points = None
+        if points is not None and points.ndim == 3 and points.shape[1] > 0 and points.shape[2] >= 2:
+            mins = points[:, :, :2].min(axis=1)
+            maxs = points[:, :, :2].max(axis=1)
+            return [(min_x, min_y, max_x, max_y) for (min_x, min_y), (max_x, max_y) in zip(mins.tolist(), maxs.tolist())]
+
+    bounds = []
+    for box in boxes:
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        bounds.append((min(xs), min(ys), max(xs), max(ys)))
+    return bounds
+
+
+def _introspect(paddle_ocr_class):
+    try:
+        import inspect
+        params = inspect.signature(paddle_ocr_class).parameters
+    except Exception:
+        params = {}
+
+    def pick(*names):
+        return next((name for name in names if name in params), None)
+
+    return {
+        "det_model_dir": pick("text_detection_model_dir") or "det_model_dir",
+        "rec_model_dir": pick("text_recognition_model_dir") or "rec_model_dir",
+        "cls_model_dir": pick("textline_orientation_model_dir", "cls_model_dir"),
+        "use_angle_cls": pick("use_textline_orientation", "use_angle_cls"),
+        "device": pick("use_gpu", "device", "device_type"),
+        "show_log": pick("show_log"),
+    }
+
+
+def _build_payload(result, width, height):
+    lines = _flatten_result(result)
+
+    entries = []
+    for line in lines:
+        if not _is_line_entry(line):
+            continue
+        text_info = line[1]
+        text = text_info[0] if text_info else ""
+        if not text or not str(text).strip():
+            continue
+        entries.append((str(text).strip(), line[0]))
+
+    boxes = []
+    bounds = _box_bounds([box for _, box in entries])
+    for (text, _), (min_x, min_y, max_x, max_y) in zip(entries, bounds):
+        rect_width = max_x - min_x
+        rect_height = max_y - min_y
+        flipped_y = height - max_y
+
+        boxes.append(
+            {
+                "text": text,
+                "rect": [float(min_x), float(flipped_y), float(rect_width), float(rect_height)],
+            }
+        )
+
+    return {"width": float(width), "height": float(height), "boxes": boxes}
+
+
+def _decode_image(cv2, data: bytes):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _process_request(ocr, cv2, request, use_angle_cls: bool):
+    if request.get("image"):
+        image = _decode_image(cv2, base64.b64decode(request["image"]))
+        if image is None:
+            raise ValueError("Failed to decode image")
+        height, width = image.shape[:2]
+        result = ocr.ocr(image, cls=use_angle_cls)
+    elif request.get("path"):
+        size = _image_size(request["path"])
+        if not size:
+            raise ValueError("Failed to read image size")
+        width, height = size
+        result = ocr.ocr(request["path"], cls=use_angle_cls)
+    else:
+        raise ValueError("Missing image or path")
+    return _build_payload(result, width, height)
+
+
+def _claim_stdout():
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return protocol_out
+
+
+def _run_daemon(ocr, cv2, use_angle_cls: bool, out) -> None:
+    out.write(json.dumps({"ready": True}) + "\n")
+    out.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            response = _process_request(ocr, cv2, json.loads(line), use_angle_cls)
+        except Exception as exc:
+            print("OCR request failed: %s" % exc, file=sys.stderr)
+            response = {"error": str(exc)}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--image")
     parser.add_argument("--stdin", action="store_true")
+    parser.add_argument("--daemon", action="store_true")
     args = parser.parse_args()
+    protocol_out = _claim_stdout() if args.daemon else None
 
     os.environ.setdefault("DISABLE_MODEL_SOURCE_CHECK", "True")
     try:
@@ -97,99 +247,58 @@ def main():
     use_custom_models = bool(det_dir and rec_dir)
     use_angle_cls = bool(cls_dir)
 
-    try:
-        import inspect
-        signature = inspect.signature(PaddleOCR)
-        params = signature.parameters
-    except Exception:
-        params = {}
-
+    keys = _introspect(PaddleOCR)
     kwargs = {"lang": lang}
 
     if use_custom_models:
-        if "text_detection_model_dir" in params:
-            kwargs["text_detection_model_dir"] = det_dir
-        else:
-            kwargs["det_model_dir"] = det_dir
-
-        if "text_recognition_model_dir" in params:
-            kwargs["text_recognition_model_dir"] = rec_dir
-        else:
-            kwargs["rec_model_dir"] = rec_dir
-
-        if use_angle_cls:
-            if "textline_orientation_model_dir" in params:
-                kwargs["textline_orientation_model_dir"] = cls_dir
-            elif "cls_model_dir" in params:
-                kwargs["cls_model_dir"] = cls_dir
-
-    if "use_textline_orientation" in params:
-        kwargs["use_textline_orientation"] = use_angle_cls
-    elif "use_angle_cls" in params:
-        kwargs["use_angle_cls"] = use_angle_cls
-
-    if "use_gpu" in params:
+        kwargs[keys["det_model_dir"]] = det_dir
+        kwargs[keys["rec_model_dir"]] = rec_dir
+        if use_angle_cls and keys["cls_model_dir"]:
+            kwargs[keys["cls_model_dir"]] = cls_dir
+
+    if keys["use_angle_cls"]:
+        kwargs[keys["use_angle_cls"]] = use_angle_cls
+
+    if keys["device"] == "use_gpu":
         kwargs["use_gpu"] = use_gpu
-    elif "device" in params:
-        kwargs["device"] = "gpu" if use_gpu else "cpu"
-    elif "device_type" in params:
-        kwargs["device_type"] = "gpu" if use_gpu else "cpu"
+    elif keys["device"]:
+        kwargs[keys["device"]] = "gpu" if use_gpu else "cpu"
 
-    if "show_log" in params:
+    if keys["show_log"]:
         kwargs["show_log"] = False
 
     ocr = PaddleOCR(**kwargs)
 
-    if args.stdin:
+    if args.stdin or args.daemon:
         try:
             import cv2
-            import numpy as np
         except Exception as exc:
             _error("Failed to import cv2/numpy: %s" % exc, 4)
+        if np is None:
+            _error("Failed to import cv2/numpy: numpy is not installed", 4)
+
+    if args.daemon:
+        _run_daemon(ocr, cv2, use_angle_cls, protocol_out)
+        return
+
+    if args.stdin:
         payload = sys.stdin.buffer.read()
         if not payload:
             _error("No image data received on stdin", 5)
-        image = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+        image = _decode_image(cv2, payload)
         if image is None:
             _error("Failed to decode image from stdin", 6)
         height, width = image.shape[:2]
         result = ocr.ocr(image, cls=use_angle_cls)
     else:
         if not args.image:
-            _error("Missing --image or --stdin", 7)
+            _error("Missing --image, --stdin, or --daemon", 7)
         size = _image_size(args.image)
         if not size:
             _error("Failed to read image size", 8)
         width, height = size
         result = ocr.ocr(args.image, cls=use_angle_cls)
-    lines = _flatten_result(result)
-
-    boxes = []
-    for line in lines:
-        if not _is_line_entry(line):
-            continue
-        box = line[0]
-        text_info = line[1]
-        text = text_info[0] if text_info else ""
-        if not text or not str(text).strip():
-            continue
-
-        xs = [point[0] for point in box]
-        ys = [point[1] for point in box]
-        min_x, max_x = min(xs), max(xs)
-        min_y, max_y = min(ys), max(ys)
-        rect_width = max_x - min_x
-        rect_height = max_y - min_y
-        flipped_y = height - max_y
-
-        boxes.append(
-            {
-                "text": str(text).strip(),
-                "rect": [float(min_x), float(flipped_y), float(rect_width), float(rect_height)],
-            }
-        )
-
-    payload = {"width": float(width), "height": float(height), "boxes": boxes}
+    payload = _build_payload(result, width, height)
     sys.stdout.write(json.dumps(payload))
 
 
@@ -41,6 +41,9 @@ final class OCRScreenshotApp: NSObject, NSApplicationDelegate {
         hotKeyManager.register()
         self.hotKeyManager = hotKeyManager
         DanubePostProcessor.shared.prewarm()
+        if OCRBackend.current == .paddle {
+            PaddleOCRRunner()?.prewarm()
+        }
         startSelfTestIfNeeded()
     }
 
@@ -101,6 +101,8 @@ install_danube() {
   setup_venv "$danube_venv"
   "$danube_python" -m pip install --upgrade pip
   "$danube_python" -m pip install llama-cpp-python
+  "$danube_python" -m pip install huggingface_hub hf_transfer || log "huggingface_hub/hf_transfer unavailable; using built-in downloader."
+  "$danube_python" -m pip install orjson || log "orjson unavailable; using json."
 
   DANUBE_MODEL_DIR="$danube_models" "$danube_python" - <<PY
 import importlib.util